@@ -0,0 +1,222 @@
+from itertools import combinations_with_replacement
+from math import factorial
+
+from universalKaprekarRoutineByNumberBase import (
+    from_digits_in_base,
+    get_digits_in_base,
+    int_to_base_string,
+)
+
+
+# --- Multiset Helpers ---
+# K(N) only depends on the digits of N, not their order, so every query below
+# works on digit multisets (stored as tuples sorted descending) and only
+# expands them to explicit integers when asked.
+def digit_multiset(num, width, base):
+    """Returns the digits of num (padded to width) sorted descending."""
+    return tuple(sorted(get_digits_in_base(num, width, base), reverse=True))
+
+
+def kaprekar_step_multiset(multiset, base):
+    """Performs the routine on a descending digit multiset."""
+    return from_digits_in_base(multiset, base) - from_digits_in_base(multiset[::-1], base)
+
+
+def multiset_count(multiset):
+    """Number of distinct width-digit integers with exactly these digits."""
+    total = factorial(len(multiset))
+    for d in set(multiset):
+        total //= factorial(multiset.count(d))
+    return total
+
+
+def expand_multiset(multiset, base):
+    """Yields every integer with exactly these digits, in ascending order."""
+    counts = {}
+    for d in multiset:
+        counts[d] = counts.get(d, 0) + 1
+    digits = sorted(counts)
+    width = len(multiset)
+
+    def build(prefix_val, remaining):
+        if remaining == 0:
+            yield prefix_val
+            return
+        for d in digits:
+            if counts[d] == 0:
+                continue
+            counts[d] -= 1
+            yield from build(prefix_val * base + d, remaining - 1)
+            counts[d] += 1
+
+    yield from build(0, width)
+
+
+# --- The Reverse Index ---
+class PreimageIndex:
+    """
+    Reverse map of the Kaprekar functional graph for one (base, width).
+
+    Building it costs one step per digit multiset, C(base + width - 1, width),
+    instead of one per integer (base ** width). Queries afterwards only touch
+    the multisets that are part of the answer.
+    """
+
+    def __init__(self, base, width):
+        self.base = base
+        self.width = width
+        # image value -> multisets whose step lands on it
+        self._preimages = {}
+        # multiset -> image values written with those digits
+        self._image_by_multiset = {}
+
+        for multiset in combinations_with_replacement(range(base - 1, -1, -1), width):
+            value = kaprekar_step_multiset(multiset, base)
+            self._preimages.setdefault(value, []).append(multiset)
+
+        for value in self._preimages:
+            key = digit_multiset(value, width, base)
+            self._image_by_multiset.setdefault(key, []).append(value)
+
+    def image(self):
+        """All values K can produce for this base and width."""
+        return sorted(self._preimages)
+
+    def preimage_multisets(self, value):
+        """Digit multisets M with K(M) == value."""
+        return list(self._preimages.get(value, []))
+
+    def preimage_count(self, value):
+        """Number of integers N with K(N) == value."""
+        return sum(multiset_count(m) for m in self._preimages.get(value, []))
+
+    def preimages(self, value):
+        """Sorted list of every integer N with K(N) == value."""
+        return self._expand(self._preimages.get(value, []))
+
+    def k_step_multisets(self, value, k):
+        """Digit multisets M with K^k(M) == value (k >= 1)."""
+        if k < 1:
+            raise ValueError("k must be at least 1 for multiset queries")
+
+        level = set(self._preimages.get(value, []))
+        for _ in range(k - 1):
+            next_level = set()
+            for multiset in level:
+                for v in self._image_by_multiset.get(multiset, []):
+                    next_level.update(self._preimages[v])
+            level = next_level
+            if not level:
+                break
+        return sorted(level, reverse=True)
+
+    def k_step_count(self, value, k):
+        """Number of integers N with K^k(N) == value."""
+        if k == 0:
+            return 1 if self._in_range(value) else 0
+        return sum(multiset_count(m) for m in self.k_step_multisets(value, k))
+
+    def k_step_preimages(self, value, k):
+        """Sorted list of every integer N with K^k(N) == value."""
+        if k == 0:
+            return [value] if self._in_range(value) else []
+        return self._expand(self.k_step_multisets(value, k))
+
+    def backward_bfs(self, target, max_distance=None):
+        """
+        Groups multisets by the first step at which they reach target.
+
+        Returns a list of layers; layer[d] holds the multisets whose integers
+        hit target in exactly d steps (layer[0] is empty, since only target
+        itself is at distance 0 and it may share digits with other values).
+        With max_distance the search stops after that layer.
+        """
+        layers = [[]]
+        seen = set()
+        frontier = []
+        for multiset in self._preimages.get(target, []):
+            seen.add(multiset)
+            frontier.append(multiset)
+
+        last = float("inf") if max_distance is None else max_distance
+        while frontier and len(layers) <= last:
+            layers.append(sorted(frontier, reverse=True))
+            if len(layers) > last:
+                # Don't expand past the last layer asked for
+                break
+            next_frontier = []
+            for multiset in frontier:
+                for v in self._image_by_multiset.get(multiset, []):
+                    if v == target:
+                        continue
+                    for pre in self._preimages[v]:
+                        if pre not in seen:
+                            seen.add(pre)
+                            next_frontier.append(pre)
+            frontier = next_frontier
+
+        return layers
+
+    def exact_distance_count(self, target, distance, layers=None):
+        """
+        Number of integers N != target whose first hit of target is at this distance.
+
+        Pass the layers from an earlier backward_bfs(target) to avoid redoing it.
+        """
+        layer = self._distance_layer(target, distance, layers)
+        total = sum(multiset_count(m) for m in layer)
+        # target is counted at distance 0, not in the layer its digits fall into
+        if digit_multiset(target, self.width, self.base) in layer:
+            total -= 1
+        return total
+
+    def exact_distance_preimages(self, target, distance, layers=None):
+        """
+        Sorted list of every integer N != target whose first hit of target is at this distance.
+
+        Pass the layers from an earlier backward_bfs(target) to avoid redoing it.
+        """
+        starts = self._expand(self._distance_layer(target, distance, layers))
+        return [n for n in starts if n != target]
+
+    def _distance_layer(self, target, distance, layers):
+        if layers is None:
+            layers = self.backward_bfs(target, max_distance=distance)
+        if distance >= len(layers):
+            return []
+        return layers[distance]
+
+    def _in_range(self, value):
+        return 0 <= value < self.base ** self.width
+
+    def _expand(self, multisets):
+        values = []
+        for multiset in multisets:
+            values.extend(expand_multiset(multiset, self.base))
+        return sorted(values)
+
+
+def main():
+    base, width, target = 10, 4, 6174
+    index = PreimageIndex(base, width)
+
+    print(f"Base {base}, {width} digits: {len(index.image())} distinct image values")
+    print(f"{'Steps':<6} | {'Multisets':<10} | {'Starts'}")
+    print("-" * 40)
+    layers = index.backward_bfs(target)
+    for distance, layer in enumerate(layers):
+        if distance == 0:
+            continue
+        print(f"{distance:<6} | {len(layer):<10} | {index.exact_distance_count(target, distance, layers)}")
+
+    base, width, target = 10, 8, 63317664
+    index = PreimageIndex(base, width)
+    multisets = index.preimage_multisets(target)
+    print(f"\nPreimages of {int_to_base_string(target, base)} ({width} digits):")
+    print(f"{len(multisets)} multisets, {index.preimage_count(target)} integers")
+    for multiset in multisets:
+        print("  " + "".join(int_to_base_string(d, base) for d in multiset))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from kaprekarTrajectoryMemo import DEFAULT_MAX_ENTRIES, TrajectoryMemo, split_max_entries
+from main import find_constants_for_width, hypothesis_check, pattern_grid
+from universalKaprekarRoutineByNumberBase import base_width_grid, find_constants_universal, format_constants
+
+
+# --- Per-Cell Budgets ---
+class CellBudget:
+    """
+    Time and/or step allowance for one (base, width) cell.
+
+    The finders check it between trials, so a cell overshoots by at most one
+    trajectory, and set stopped_early when they skip remaining trials. Such a
+    cell is reported as unresolved rather than as "Loops" / "No Constant",
+    since it simply stopped looking; a cell that ran every trial is resolved
+    even if its last trajectory used up the budget. Setting cancel_event
+    exhausts every budget watching it, which is how a sweep is stopped.
+    """
+
+    def __init__(self, max_seconds=None, max_steps=None, cancel_event=None):
+        self.max_seconds = max_seconds
+        self.max_steps = max_steps
+        self.cancel_event = cancel_event
+        self.steps = 0
+        self.stopped_early = False
+        self.started = time.monotonic()
+
+    def wrap(self, step):
+        """Returns step with every call charged against this budget."""
+        def counted_step(num):
+            self.steps += 1
+            return step(num)
+
+        return counted_step
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def exhausted(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            return True
+        if self.max_steps is not None and self.steps >= self.max_steps:
+            return True
+        return self.max_seconds is not None and self.elapsed() >= self.max_seconds
+
+
+# --- Worker Side ---
+# Each worker process keeps its own memo for its lifetime, so trials within a
+# cell share converging tails. The sweeps never repeat a (base, width) pair,
+# so nothing is shared across cells; the orchestrator splits its memo cap
+# between workers to keep the run as a whole under it.
+_worker_memo = None
+_cancel_event = None
+
+
+def _init_worker(memo_max_entries, cancel_event):
+    global _worker_memo, _cancel_event
+    # Ctrl+C is handled by the orchestrator, which sets cancel_event so that
+    # running cells stop at their next trial
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_memo = TrajectoryMemo(memo_max_entries)
+    _cancel_event = cancel_event
+
+
+def run_cell(cell, max_seconds=None, max_steps=None):
+    """
+    Runs one (kind, base, width, trials) cell and returns its result row,
+    or None if the sweep was stopped before the cell started.
+    """
+    if _cancel_event is not None and _cancel_event.is_set():
+        return None
+
+    kind, base, width, trials = cell
+    budget = CellBudget(max_seconds, max_steps, _cancel_event)
+    memo = _worker_memo if _worker_memo is not None else TrajectoryMemo()
+    hits, misses = memo.hits, memo.misses
+
+    if kind == "decimal":
+        constants = find_constants_for_width(width, trials, memo, budget)
+    else:
+        constants = find_constants_universal(base, width, trials, memo, budget)
+
+    return {
+        "cell": cell,
+        "status": "unresolved" if budget.stopped_early else "resolved",
+        "constants": constants,
+        "seconds": budget.elapsed(),
+        "steps": budget.steps,
+        "memo_hits": memo.hits - hits,
+        "memo_misses": memo.misses - misses,
+    }
+
+
+def decimal_cells():
+    """The widths swept by main.analyze_pattern."""
+    return [("decimal", 10, width, trials) for width, trials in pattern_grid()]
+
+
+def universal_cells():
+    """The (base, width) grid swept by universalKaprekarRoutineByNumberBase.main."""
+    return [("universal", base, width, trials) for base, width, trials in base_width_grid()]
+
+
+def cell_work(cell):
+    """Rough cost of a cell: trials times digits per Kaprekar step."""
+    _, _, width, trials = cell
+    return trials * width
+
+
+# --- The Orchestrator ---
+class SweepOrchestrator:
+    """
+    Submits cells to a process pool and streams results as they finish.
+
+    Finished rows accumulate in self.results, which stays valid after the run
+    is cancelled. Cancelling drops queued cells and stops running ones at
+    their next trial; those come back as unresolved rows rather than being
+    lost. memo_max_entries caps the tail memos of all workers together.
+    """
+
+    def __init__(self, cells, workers=None, max_seconds=None, max_steps=None,
+                 memo_max_entries=DEFAULT_MAX_ENTRIES, on_result=None, progress_stream=sys.stderr):
+        self.cells = list(cells)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_seconds = max_seconds
+        self.max_steps = max_steps
+        self.memo_max_entries = memo_max_entries
+        self.on_result = on_result
+        self.progress_stream = progress_stream
+        self.results = []
+        self._progress_len = 0
+        self._total_work = sum(cell_work(cell) for cell in self.cells)
+        self._done_work = 0
+
+    async def run(self):
+        cancel_event = multiprocessing.Event()
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(split_max_entries(self.memo_max_entries, self.workers), cancel_event),
+        )
+        started = time.monotonic()
+        submitted = {}
+        pending = set()
+        try:
+            for cell in self.cells:
+                future = pool.submit(run_cell, cell, self.max_seconds, self.max_steps)
+                submitted[asyncio.wrap_future(future)] = future
+            pending = set(submitted)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future.result(), started)
+        finally:
+            # Running cells see the event at their next trial; queued ones are dropped
+            cancel_event.set()
+            running = [f for f in pending if not submitted[f].cancel()]
+            for outcome in await asyncio.gather(*running, return_exceptions=True):
+                if isinstance(outcome, dict):
+                    self._collect(outcome, started)
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._clear_progress()
+
+        return self.results
+
+    def _collect(self, result, started):
+        if result is None:
+            return
+        self.results.append(result)
+        self._done_work += cell_work(result["cell"])
+        self._clear_progress()
+        if self.on_result is not None:
+            self.on_result(result)
+        self._show_progress(started)
+
+    def _show_progress(self, started):
+        if self.progress_stream is None:
+            return
+        done = len(self.results)
+        total = len(self.cells)
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        steps_rate = sum(r["steps"] for r in self.results) / elapsed if elapsed > 0 else 0.0
+        # Later cells are wider and run more trials, so weight the ETA by work, not cells
+        work_rate = self._done_work / elapsed if elapsed > 0 else 0.0
+        eta = (self._total_work - self._done_work) / work_rate if work_rate > 0 else 0.0
+        hits = sum(r["memo_hits"] for r in self.results)
+        lookups = hits + sum(r["memo_misses"] for r in self.results)
+        hit_rate = 100.0 * hits / lookups if lookups else 0.0
+        line = (f"[{done}/{total}] {rate:.2f} cells/s | {steps_rate:,.0f} steps/s | "
+                f"memo hits {hit_rate:.0f}% | ETA {int(eta) // 60:d}:{int(eta) % 60:02d}")
+        self.progress_stream.write("\r" + line)
+        self.progress_stream.flush()
+        self._progress_len = len(line)
+
+    def _clear_progress(self):
+        if self.progress_stream is None or not self._progress_len:
+            return
+        self.progress_stream.write("\r" + " " * self._progress_len + "\r")
+        self.progress_stream.flush()
+        self._progress_len = 0
+
+
+# --- Row Formatting ---
+def print_universal_row(result):
+    _, base, width, _ = result["cell"]
+    constants = result["constants"]
+    if result["status"] == "unresolved":
+        status = "Unresolved"
+    else:
+        status = "Success" if constants else "Loops"
+    output = format_constants(constants, base) if constants else "-"
+    print(f"{base:<5} | {width:<7} | {status:<12} | {output}", flush=True)
+
+
+def print_decimal_row(result):
+    _, _, width, _ = result["cell"]
+    count = len(result["constants"])
+    if result["status"] == "unresolved":
+        status = "Unresolved"
+    else:
+        status = "Success" if count > 0 else "No Constant"
+    print(f"{width:<8} | {count:<6} | {status:<15} | {result['seconds']:.1f}s", flush=True)
+
+
+def print_decimal_summary(results):
+    """Prints the hypothesis table in width order; it needs the previous even row."""
+    by_width = {r["cell"][2]: r for r in results}
+    print(f"\n{'Digits':<8} | {'Count':<6} | {'Status':<15} | {'Hypothesis Check'}")
+    print("-" * 75)
+
+    prev_even_count = 0
+    # Why the previous even width can't be compared against: "not run" or "unresolved"
+    prev_even_gap = None
+    for width, _ in pattern_grid():
+        result = by_width.get(width)
+        if result is None:
+            print(f"{width:<8} | {'-':<6} | {'Not Run':<15} | -")
+            if width % 2 == 0:
+                prev_even_gap = "not run"
+            continue
+
+        count = len(result["constants"])
+        if result["status"] == "unresolved":
+            status = "Unresolved"
+            hypothesis_msg = "Stopped early, count is a lower bound"
+        elif width % 2 == 0 and width != 2 and prev_even_gap is not None:
+            status = "Success" if count > 0 else "No Constant"
+            hypothesis_msg = f"Previous even width {prev_even_gap}"
+        else:
+            status = "Success" if count > 0 else "No Constant"
+            hypothesis_msg = hypothesis_check(width, count, prev_even_count)
+
+        if width % 2 == 0:
+            prev_even_count = count
+            prev_even_gap = "unresolved" if result["status"] == "unresolved" else None
+
+        print(f"{width:<8} | {count:<6} | {status:<15} | {hypothesis_msg}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a Kaprekar constant sweep on a worker pool.",
+        epilog="Ctrl+C drops queued cells and stops running ones at their next trial; "
+               "their partial rows are kept as Unresolved.",
+    )
+    parser.add_argument("--sweep", choices=["universal", "decimal"], default="universal")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-seconds", type=float, default=None,
+                        help="time budget per cell")
+    parser.add_argument("--max-steps", type=int, default=None,
+                        help="Kaprekar step budget per cell")
+    parser.add_argument("--memo-entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="tail memo cap for the whole run, split evenly between workers")
+    args = parser.parse_args()
+
+    if args.sweep == "decimal":
+        cells = decimal_cells()
+        print_row = print_decimal_row
+        print(f"{'Digits':<8} | {'Count':<6} | {'Status':<15} | {'Time'}")
+    else:
+        cells = universal_cells()
+        print_row = print_universal_row
+        print(f"{'Base':<5} | {'Digits':<7} | {'Status':<12} | {'Found Constants (Base Representation)'}")
+    print("-" * 80)
+
+    orchestrator = SweepOrchestrator(
+        cells,
+        workers=args.workers,
+        max_seconds=args.max_seconds,
+        max_steps=args.max_steps,
+        memo_max_entries=args.memo_entries,
+        on_result=print_row,
+    )
+    try:
+        asyncio.run(orchestrator.run())
+    except KeyboardInterrupt:
+        cut_short = sum(1 for r in orchestrator.results if r["status"] == "unresolved")
+        print(f"\nStopped: {len(orchestrator.results) - cut_short} of {len(cells)} cells finished, "
+              f"{cut_short} cut short.")
+
+    if args.sweep == "decimal":
+        print_decimal_summary(orchestrator.results)
+
+
+if __name__ == "__main__":
+    main()
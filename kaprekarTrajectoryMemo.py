@@ -0,0 +1,94 @@
+from collections import OrderedDict
+
+# Each entry holds a (base, width, state) key tuple, an (attractor, distance)
+# value tuple and an OrderedDict node: about 270-290 bytes in CPython, so the
+# default cap stays under roughly 300 MB. When several processes each keep a
+# memo, split one cap between them so the run as a whole stays under it.
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+
+def split_max_entries(total_entries, workers):
+    """Per-process cap when total_entries is split across that many memos."""
+    return max(1, total_entries // max(1, workers))
+
+
+class TrajectoryMemo:
+    """
+    Bounded LRU memo of visited state -> (attractor, distance).
+
+    Keys are (base, width, state), so one memo can be shared across every
+    cell of a run: cells with the same base and width reuse each other's
+    tails, and everything else simply competes for the same capacity.
+    An attractor of None means the state never reaches a nonzero fixed point
+    (it falls into a loop or into 0).
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def resolve_trajectory(start, step, memo, base, width, max_steps):
+    """
+    Follows start under step until it reaches a known state, a fixed point
+    or a loop, then records every new state on the way in the memo.
+
+    Returns the nonzero fixed point start reaches within max_steps steps,
+    or None, matching the plain step-limited walk it replaces.
+    """
+    path = []
+    on_path = set()
+    current = start
+
+    for _ in range(max_steps):
+        cached = memo.get((base, width, current))
+        if cached is not None:
+            attractor, distance = cached
+            break
+        if current in on_path:
+            # Loop: nothing on the path reaches a fixed point
+            attractor, distance = None, 0
+            break
+
+        next_val = step(current)
+        if next_val == current:
+            attractor = current if current != 0 else None
+            distance = 0
+            memo.put((base, width, current), (attractor, distance))
+            break
+
+        path.append(current)
+        on_path.add(current)
+        current = next_val
+    else:
+        # Step limit hit before the tail resolved; its fate is unknown
+        return None
+
+    for offset, state in enumerate(reversed(path), start=1):
+        memo.put((base, width, state), (attractor, distance + offset))
+
+    if attractor is not None and len(path) + distance < max_steps:
+        return attractor
+    return None
@@ -1,6 +1,8 @@
 import random
 import time
 
+from kaprekarTrajectoryMemo import DEFAULT_MAX_ENTRIES, TrajectoryMemo, resolve_trajectory
+
 
 def get_digits(num, width):
     return [int(d) for d in f"{num:0{width}d}"]
@@ -22,79 +24,90 @@ def kaprekar_step(num, width):
     return max_val - min_val
 
 
-def find_constants_for_width(width, trials=5000):
+def find_constants_for_width(width, trials=5000, memo=None, budget=None):
     """
     Stochastically searches for constants.
+
+    Trajectories stop as soon as they reach a state already in memo, so
+    passing one memo across calls lets trials share converging tails.
+    An optional budget (see kaprekarSweepOrchestrator.CellBudget) ends the
+    search early once exhausted and sets budget.stopped_early.
     """
+    if memo is None:
+        memo = TrajectoryMemo()
+    step = lambda n: kaprekar_step(n, width)
+    if budget is not None:
+        step = budget.wrap(step)
     found_constants = set()
 
     # We always include specific 'seed' patterns to ensure we don't miss
     # the 6174-derivatives (e.g., 63317664) which have small basins sometimes.
-    seeds = [random.randint(0, 10 ** width - 1) for _ in range(trials)]
+    # Drawn lazily so a budget check can stop the search before every seed is made
+    seeds = (random.randint(0, 10 ** width - 1) for _ in range(trials))
 
     for start_num in seeds:
+        if budget is not None and budget.exhausted():
+            budget.stopped_early = True
+            break
+
         # Quick filter for repdigits
         if len(set(get_digits(start_num, width))) < 2:
             continue
 
-        current = start_num
-        history = set()
-
         # Run routine (limit steps to avoid infinite loops)
-        for _ in range(60):
-            if current in history:
-                break
-            history.add(current)
+        constant = resolve_trajectory(start_num, step, memo, 10, width, 60)
+        if constant is not None:
+            found_constants.add(constant)
 
-            next_val = kaprekar_step(current, width)
+    return sorted(list(found_constants))
 
-            if next_val == current and next_val != 0:
-                found_constants.add(current)
-                break
-            current = next_val
 
-    return sorted(list(found_constants))
+def hypothesis_check(width, count, prev_even_count):
+    """Compares a width's constant count with the odd/even growth hypothesis."""
+    if width % 2 != 0:
+        # ODD DIGITS CHECK
+        if count == 1:
+            return "✅ Fits (1 const)"
+        elif count > 1:
+            return f"❌ Divergent ({count} consts)"
+        return "No const"
+
+    # EVEN DIGITS CHECK
+    # For the first even number (2), there is no 'previous' to compare validly
+    if width == 2:
+        return "Base Case"
+    expected = prev_even_count + 1
+    if count == expected:
+        return f"✅ Fits (+1 pattern: {count})"
+    elif count > expected:
+        return f"⚠️ BONUS FOUND ({count} > {expected})"
+    return f"❌ BROKEN ({count} < {expected})"
+
+
+def pattern_grid():
+    """(width, trials) pairs swept by analyze_pattern."""
+    # We will test from 2 up to 20
+    return [(width, 5000) for width in range(2, 21)]
 
 
-def analyze_pattern():
+def analyze_pattern(memo_max_entries=DEFAULT_MAX_ENTRIES):
     print(f"{'Digits':<8} | {'Count':<6} | {'Status':<15} | {'Hypothesis Check'}")
     print("-" * 75)
 
     # Trackers for the user's hypothesis
     prev_even_count = 0
 
-    # We will test from 2 up to 20
-    test_range = [2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20]
+    # One memo for the whole run; raise or lower the cap to trade memory for speed
+    memo = TrajectoryMemo(max_entries=memo_max_entries)
 
-    for width in test_range:
-        constants = find_constants_for_width(width)
+    for width, trials in pattern_grid():
+        constants = find_constants_for_width(width, trials, memo=memo)
         count = len(constants)
 
         status = "Success" if count > 0 else "No Constant"
-        hypothesis_msg = ""
-
-        if width % 2 != 0:
-            # ODD DIGITS CHECK
-            if count == 1:
-                hypothesis_msg = "✅ Fits (1 const)"
-            elif count > 1:
-                hypothesis_msg = f"❌ Divergent ({count} consts)"
-            else:
-                hypothesis_msg = "No const"
-        else:
-            # EVEN DIGITS CHECK
-            # For the first even number (2), there is no 'previous' to compare validly
-            if width == 2:
-                hypothesis_msg = "Base Case"
-            else:
-                expected = prev_even_count + 1
-                if count == expected:
-                    hypothesis_msg = f"✅ Fits (+1 pattern: {count})"
-                elif count > expected:
-                    hypothesis_msg = f"⚠️ BONUS FOUND ({count} > {expected})"
-                elif count < expected:
-                    hypothesis_msg = f"❌ BROKEN ({count} < {expected})"
+        hypothesis_msg = hypothesis_check(width, count, prev_even_count)
 
+        if width % 2 == 0:
             # Update previous even count for next even iteration
             prev_even_count = count
 
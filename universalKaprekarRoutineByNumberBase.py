@@ -1,5 +1,7 @@
 import random
 
+from kaprekarTrajectoryMemo import DEFAULT_MAX_ENTRIES, TrajectoryMemo, resolve_trajectory
+
 
 # --- Helper Functions for Base Conversion ---
 def int_to_base_string(n, base):
@@ -49,13 +51,28 @@ def kaprekar_step_base(num, width, base):
     return max_val - min_val
 
 
-def find_constants_universal(base, width, trials=500):
-    """Searches for constants in a specific base and width."""
+def find_constants_universal(base, width, trials=500, memo=None, budget=None):
+    """Searches for constants in a specific base and width.
+
+    Trajectories stop as soon as they reach a state already in memo, so
+    passing one memo across calls lets trials share converging tails.
+    An optional budget (see kaprekarSweepOrchestrator.CellBudget) ends the
+    search early once exhausted and sets budget.stopped_early.
+    """
+    if memo is None:
+        memo = TrajectoryMemo()
+    step = lambda n: kaprekar_step_base(n, width, base)
+    if budget is not None:
+        step = budget.wrap(step)
     found = set()
 
     # Optimization: For small bases/widths, we can be exhaustive,
     # but for safety/speed we stick to random sampling (Monte Carlo).
     for _ in range(trials):
+        if budget is not None and budget.exhausted():
+            budget.stopped_early = True
+            break
+
         # Generate random start number for this base
         max_limit = base ** width
         start_num = random.randint(0, max_limit - 1)
@@ -65,59 +82,60 @@ def find_constants_universal(base, width, trials=500):
         if len(set(digits)) < 2:
             continue
 
-        current = start_num
-        history = set()
+        # Iterate routine until a fixed point, a loop or a known tail
+        constant = resolve_trajectory(start_num, step, memo, base, width, 50)
+        if constant is not None:
+            found.add(constant)
 
-        # Iterate routine
-        for _ in range(50):
-            if current in history:
-                break
-            history.add(current)
+    return sorted(list(found))
 
-            next_val = kaprekar_step_base(current, width, base)
 
-            # Check for Fixed Point
-            if next_val == current and next_val != 0:
-                found.add(current)
-                break
-            current = next_val
+def format_constants(constants, base):
+    """Renders constants in their base, truncated after the first three."""
+    # Convert finding to string representation (e.g. 10 -> A)
+    const_strs = [int_to_base_string(c, base) for c in constants]
+    # Truncate if too many constants found
+    if len(const_strs) > 3:
+        return f"{', '.join(const_strs[:3])} (+{len(const_strs) - 3} more)"
+    return ", ".join(const_strs)
 
-    return sorted(list(found))
 
+def base_width_grid():
+    """(base, width, trials) cells swept by main."""
+    # We test bases from 2 (Binary) to 16 (Hexadecimal) and digit widths 2 to 20
+    # You can change these ranges to test higher bases
+    # Increase trials for higher bases/widths to improve accuracy
+    return [
+        (base, width, 300 if width < 10 else 800)
+        for base in range(2, 17)
+        for width in range(2, 21)
+    ]
 
-def main():
+
+def main(memo_max_entries=DEFAULT_MAX_ENTRIES):
     print(f"{'Base':<5} | {'Digits':<7} | {'Status':<12} | {'Found Constants (Base Representation)'}")
     print("-" * 80)
 
-    # We test bases from 2 (Binary) to 16 (Hexadecimal)
-    # You can change this range to test higher bases
-    bases_to_test = range(2, 17)
-
-    for base in bases_to_test:
-        print(f"--- Processing Base {base} ---")
-
-        # We test digit widths 2 to 20
-        for width in range(2, 21):
-            # Increase trials for higher bases/widths to improve accuracy
-            trials = 300 if width < 10 else 800
-
-            constants = find_constants_universal(base, width, trials)
-
-            if constants:
-                status = "Success"
-                # Convert finding to string representation (e.g. 10 -> A)
-                const_strs = [int_to_base_string(c, base) for c in constants]
-                # Truncate if too many constants found
-                if len(const_strs) > 3:
-                    output = f"{', '.join(const_strs[:3])} (+{len(const_strs) - 3} more)"
-                else:
-                    output = ", ".join(const_strs)
-            else:
-                status = "Loops"
-                output = "-"
-
-            # Print row
-            print(f"{base:<5} | {width:<7} | {status:<12} | {output}")
+    # One memo for the whole run; raise or lower the cap to trade memory for speed
+    memo = TrajectoryMemo(max_entries=memo_max_entries)
+
+    current_base = None
+    for base, width, trials in base_width_grid():
+        if base != current_base:
+            print(f"--- Processing Base {base} ---")
+            current_base = base
+
+        constants = find_constants_universal(base, width, trials, memo)
+
+        if constants:
+            status = "Success"
+            output = format_constants(constants, base)
+        else:
+            status = "Loops"
+            output = "-"
+
+        # Print row
+        print(f"{base:<5} | {width:<7} | {status:<12} | {output}")
 
 
 if __name__ == "__main__":